@@ -0,0 +1,334 @@
+import streamlit as st
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import StreamWriter
+
+from typing import TypedDict, Annotated, Sequence
+import asyncio
+import collections
+import httpx
+import operator
+import queue
+import threading
+import uuid
+import json # For printing tool results if needed
+import logging
+
+# Import database utility functions and the tool decorator
+from db_utils import (
+    get_customer_by_name,
+    get_customer_by_id,
+    get_accounts_for_customer,
+    get_transactions_for_account
+)
+from langchain_core.tools import tool
+
+# --- Configuration ---
+MODEL_NAME = "llama3.2" # Or the specific llama3.2 variant you have installed with Ollama
+OLLAMA_BASE_URL = "http://127.0.0.1:11434"
+MAX_THREADS = 256 # Conversations kept in memory; every browser session starts a new one
+
+logger = logging.getLogger(__name__)
+
+# --- Cached database reads ---
+# The agent re-fetches the same customer/account on follow-up questions, so
+# memoize the read-only lookups by argument for a short while. db_utils returns
+# sqlite3.Row objects, which are converted to plain dicts here (on cache misses only)
+# so they can be pickled by the cache and serialized for the model.
+@st.cache_data(ttl=60, max_entries=1024, show_spinner=False)
+def cached_customer_by_name(name: str):
+    customer = get_customer_by_name(name)
+    return dict(customer) if customer else None
+
+@st.cache_data(ttl=60, max_entries=1024, show_spinner=False)
+def cached_customer_by_id(customer_id: int):
+    customer = get_customer_by_id(customer_id)
+    return dict(customer) if customer else None
+
+@st.cache_data(ttl=60, max_entries=1024, show_spinner=False)
+def cached_accounts_for_customer(customer_id: int):
+    return [dict(account) for account in get_accounts_for_customer(customer_id)]
+
+@st.cache_data(ttl=60, max_entries=1024, show_spinner=False)
+def cached_transactions_for_account(account_id: int, limit: int):
+    return [dict(transaction) for transaction in get_transactions_for_account(account_id, limit=limit)]
+
+# --- Define Tools using the @tool decorator ---
+@tool
+async def get_customer_by_name_tool(name: str):
+    """Finds a customer by their first, last or full name; words may be abbreviated to their beginning (case-insensitive). Returns customer details if found, otherwise None."""
+    return await asyncio.to_thread(cached_customer_by_name, name)
+
+@tool
+async def get_customer_by_id_tool(customer_id: int):
+    """Gets customer details based on their unique customer ID."""
+    return await asyncio.to_thread(cached_customer_by_id, customer_id)
+
+@tool
+async def get_accounts_for_customer_tool(customer_id: int):
+    """Gets all accounts associated with a specific customer ID. Returns a list of accounts."""
+    return await asyncio.to_thread(cached_accounts_for_customer, customer_id)
+
+@tool
+async def get_transactions_for_account_tool(account_id: int, limit: int = 10):
+    """Gets the most recent transactions for a specific account ID. Limit defaults to 10."""
+    return await asyncio.to_thread(cached_transactions_for_account, account_id, limit)
+
+# List of tools for the agent
+tools = [
+    get_customer_by_name_tool,
+    get_customer_by_id_tool,
+    get_accounts_for_customer_tool,
+    get_transactions_for_account_tool
+]
+
+# Tool lookup for the tool node
+tools_by_name = {t.name: t for t in tools}
+
+# Tool schemas in the format of Ollama's chat API, built once at import
+ollama_tools = [convert_to_openai_tool(t) for t in tools]
+
+# --- LangGraph State Definition ---
+class AgentState(TypedDict):
+    # The `add` operator delegates tasks RunnableWhenConfigurationIsAvailable
+    messages: Annotated[Sequence[HumanMessage | AIMessage | ToolMessage], operator.add]
+
+# --- LangGraph Nodes ---
+def should_continue(state: AgentState) -> str:
+    """Determines whether to continue the graph or end.
+
+    Args:
+        state (AgentState): The current graph state.
+
+    Returns:
+        str: "tools" if the agent should call tools, END otherwise.
+    """
+    last_message = state['messages'][-1]
+    # If the LLM makes a tool call, then we route to the tool node
+    if hasattr(last_message, 'tool_calls') and last_message.tool_calls:
+        return "tools"
+    # Otherwise, we stop (reply to the user)
+    return END
+
+@st.cache_resource
+def get_ollama_client():
+    """Returns the HTTP client for the Ollama server, created once per server process."""
+    # Keep connections to Ollama alive between turns and tool-loop steps
+    return httpx.AsyncClient(
+        base_url=OLLAMA_BASE_URL,
+        timeout=120,
+        limits=httpx.Limits(max_keepalive_connections=8),
+    )
+
+def to_ollama_message(message) -> dict:
+    """Converts a graph message into the message format of Ollama's chat API."""
+    if isinstance(message, HumanMessage):
+        return {"role": "user", "content": message.content}
+    if isinstance(message, ToolMessage):
+        return {"role": "tool", "content": message.content}
+    ollama_message = {"role": "assistant", "content": message.content}
+    if message.tool_calls:
+        ollama_message["tool_calls"] = [
+            {"function": {"name": call["name"], "arguments": call["args"]}} for call in message.tool_calls
+        ]
+    return ollama_message
+
+async def call_model(state: AgentState, writer: StreamWriter):
+    """Invokes the Ollama model with the current conversation state and available tools.
+
+    Posts straight to Ollama's /api/chat rather than going through a LangChain chat
+    model. Reply tokens are passed to the graph's custom stream as they arrive and
+    the complete reply, including any tool calls, is returned as one AIMessage.
+    """
+    payload = {
+        "model": MODEL_NAME,
+        "messages": [to_ollama_message(message) for message in state['messages']],
+        "tools": ollama_tools,
+        "stream": True,
+    }
+    try:
+        content = []
+        tool_calls = []
+        async with get_ollama_client().stream("POST", "/api/chat", json=payload) as response:
+            response.raise_for_status()
+            # Ollama streams one JSON object per line
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                message = chunk.get("message", {})
+                if message.get("content"):
+                    content.append(message["content"])
+                    writer(message["content"])
+                for call in message.get("tool_calls", []):
+                    tool_calls.append({
+                        "name": call["function"]["name"],
+                        "args": call["function"]["arguments"],
+                        "id": call.get("id") or str(uuid.uuid4()),
+                    })
+        # We return a list, because this will get added to the existing list
+        return {"messages": [AIMessage(content="".join(content), tool_calls=tool_calls)]}
+    except Exception as e:
+        # Runs on the graph's event loop thread, so report through the returned message rather than st.error.
+        # logging only formats the traceback if a handler actually emits the record.
+        logger.exception("Error calling Ollama model")
+        # Return an error message within the flow
+        return {"messages": [AIMessage(content=f"Sorry, I encountered an error calling the model: {e}")]}
+
+async def run_tool_call(tool_call) -> ToolMessage:
+    """Executes a single tool call and wraps its result (or error) in a ToolMessage."""
+    try:
+        result = await tools_by_name[tool_call["name"]].ainvoke(tool_call["args"])
+        content = json.dumps(result, ensure_ascii=False, default=str)
+    except Exception as e:
+        content = f"Error: {e!r}"
+    return ToolMessage(content=content, name=tool_call["name"], tool_call_id=tool_call["id"])
+
+async def call_tools(state: AgentState):
+    """Runs all tool calls of the last AI message concurrently."""
+    last_message = state['messages'][-1]
+    # The lookups are independent reads, so dispatch them together rather than one by one
+    results = await asyncio.gather(*(run_tool_call(tool_call) for tool_call in last_message.tool_calls))
+    return {"messages": list(results)}
+
+# --- LangGraph Graph Definition ---
+class DeferredMemorySaver(MemorySaver):
+    """MemorySaver that only persists the final checkpoint of each run.
+
+    The graph checkpoints after every super-step (agent, tools, agent, ...), each
+    time serializing the whole message history. Only the state at the end of a run
+    is ever read back, so intermediate checkpoints are just buffered and the last
+    one is stored when the run calls flush().
+
+    The buffer is keyed by thread, so runs on the same thread must not overlap;
+    they hold run_lock() for their whole duration. Only the MAX_THREADS most
+    recently used threads are kept; older ones are deleted when a run flushes.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._pending = {}
+        self._run_locks = {}
+        self._threads = collections.OrderedDict() # Thread ids, least recently used first
+
+    def run_lock(self, thread_id):
+        """Returns the lock that serializes runs on the given thread."""
+        return self._run_locks.setdefault(thread_id, asyncio.Lock())
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        configurable = config["configurable"]
+        self._pending[configurable["thread_id"]] = (config, checkpoint, metadata)
+        return {
+            "configurable": {
+                "thread_id": configurable["thread_id"],
+                "checkpoint_ns": configurable.get("checkpoint_ns", ""),
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        # Pending writes are only needed to resume a run that failed mid-way
+        pass
+
+    def flush(self, thread_id):
+        """Persists the last checkpoint buffered for the given thread, if any."""
+        pending = self._pending.pop(thread_id, None)
+        if pending:
+            config, checkpoint, metadata = pending
+            # Intermediate puts were skipped, so store every channel, not just the last step's updates
+            super().put(config, checkpoint, metadata, checkpoint["channel_versions"])
+        self._threads[thread_id] = None
+        self._threads.move_to_end(thread_id)
+        self._evict_threads()
+
+    def _evict_threads(self):
+        """Deletes the least recently used threads beyond MAX_THREADS, skipping any with a run in progress."""
+        for thread_id in list(self._threads)[:len(self._threads) - MAX_THREADS]:
+            lock = self._run_locks.get(thread_id)
+            if lock is not None and lock.locked():
+                continue
+            del self._threads[thread_id]
+            self._run_locks.pop(thread_id, None)
+            self._pending.pop(thread_id, None)
+            self.delete_thread(thread_id)
+
+@st.cache_resource
+def get_graph():
+    """Builds and compiles the agent graph once; Streamlit reruns reuse it and its MemorySaver."""
+    # Using MemorySaver for state persistence, written once per run
+    memory = DeferredMemorySaver()
+    builder = StateGraph(AgentState)
+
+    # Define the nodes
+    builder.add_node("agent", call_model)
+    builder.add_node("tools", call_tools) # Add the concurrent tool execution node
+
+    # Set the entry point
+    builder.set_entry_point("agent")
+
+    # Add the conditional edge
+    builder.add_conditional_edges(
+        "agent",
+        should_continue, # Function to decide routing
+        {
+            "tools": "tools", # If should_continue returns "tools", route to the tool node
+            END: END      # If should_continue returns END, finish the graph run
+        }
+    )
+
+    # Add edge from tool node back to agent node (so model can process tool results)
+    builder.add_edge("tools", "agent")
+
+    # Compile the graph
+    return builder.compile(checkpointer=memory)
+
+# --- Async Graph Execution ---
+@st.cache_resource
+def get_event_loop():
+    """Starts one event loop in a daemon thread that every graph run is scheduled on.
+
+    The cached Ollama HTTP client keeps connections bound to the loop that opened
+    them, so runs must not each spin up (and close) their own loop.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="graph-event-loop", daemon=True).start()
+    return loop
+
+def stream_graph(graph, graph_input, config, stream_mode):
+    """Runs the graph asynchronously on the background loop, yielding its stream chunks in the calling thread.
+
+    Streamlit elements can only be updated from the script thread, so chunks are
+    handed over through a queue instead of being rendered inside the coroutine.
+    If the caller stops consuming early (Streamlit interrupted the script), the
+    run is cancelled rather than left running on the loop.
+    """
+    chunks = queue.Queue()
+
+    async def drive():
+        thread_id = config["configurable"]["thread_id"]
+        try:
+            # A new turn waits for the previous run on its thread to flush, as they share its checkpoint buffer
+            async with graph.checkpointer.run_lock(thread_id):
+                try:
+                    async for chunk in graph.astream(graph_input, config=config, stream_mode=stream_mode):
+                        chunks.put(chunk)
+                finally:
+                    graph.checkpointer.flush(thread_id)
+        finally:
+            chunks.put(None)
+
+    future = asyncio.run_coroutine_threadsafe(drive(), get_event_loop())
+    finished = False
+    try:
+        while (chunk := chunks.get()) is not None:
+            yield chunk
+        finished = True
+    finally:
+        if not finished:
+            future.cancel()
+    # Re-raise any error the run ended with
+    future.result()
@@ -2,11 +2,13 @@ import sqlite3
 import random
 from faker import Faker
 from datetime import datetime, timedelta
+from db_utils import configure_connection
 
 DATABASE_NAME = 'banking.db'
 NUM_CUSTOMERS = 50
 NUM_ACCOUNTS_PER_CUSTOMER = (1, 3) # Range of accounts per customer
 NUM_TRANSACTIONS_PER_ACCOUNT = (5, 25) # Range of transactions per account
+DESCRIPTION_POOL_SIZE = 64 # Distinct Faker-generated descriptions per transaction type (the seed has ~1,500 transactions)
 
 fake = Faker()
 
@@ -14,7 +16,9 @@ def create_connection(db_file):
     """ create a database connection to the SQLite database specified by db_file """
     conn = None
     try:
-        conn = sqlite3.connect(db_file)
+        # Autocommit mode: main() wraps the bulk load in one explicit transaction
+        conn = sqlite3.connect(db_file, isolation_level=None)
+        configure_connection(conn, db_file)
         print(f"SQLite DB connection successful to {db_file}")
     except sqlite3.Error as e:
         print(e)
@@ -28,32 +32,32 @@ def create_table(conn, create_table_sql):
     except sqlite3.Error as e:
         print(e)
 
-def create_customer(conn, customer):
-    """ Create a new customer into the customers table """
+def inserted_ids(cur, count):
+    """ Return the IDs of the `count` rows just inserted by executemany """
+    # executemany leaves cur.lastrowid untouched, so ask SQLite for the last rowid.
+    # Rows inserted by one statement into a freshly created table get contiguous IDs.
+    last_id = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+    return list(range(last_id - count + 1, last_id + 1))
+
+def create_customers(cur, customers):
+    """ Insert a batch of customers into the customers table, returning their IDs """
     sql = ''' INSERT INTO customers(name, email, phone, address, date_joined)
               VALUES(?,?,?,?,?) '''
-    cur = conn.cursor()
-    cur.execute(sql, customer)
-    conn.commit()
-    return cur.lastrowid
+    cur.executemany(sql, customers)
+    return inserted_ids(cur, len(customers))
 
-def create_account(conn, account):
-    """ Create a new account into the accounts table """
+def create_accounts(cur, accounts):
+    """ Insert a batch of accounts into the accounts table, returning their IDs """
     sql = ''' INSERT INTO accounts(customer_id, account_type, balance, date_opened)
               VALUES(?,?,?,?) '''
-    cur = conn.cursor()
-    cur.execute(sql, account)
-    conn.commit()
-    return cur.lastrowid
+    cur.executemany(sql, accounts)
+    return inserted_ids(cur, len(accounts))
 
-def create_transaction(conn, transaction):
-    """ Create a new transaction into the transactions table """
+def create_transactions(cur, transactions):
+    """ Insert a batch of transactions into the transactions table """
     sql = ''' INSERT INTO transactions(account_id, amount, transaction_type, timestamp, description)
               VALUES(?,?,?,?,?) '''
-    cur = conn.cursor()
-    cur.execute(sql, transaction)
-    conn.commit()
-    return cur.lastrowid
+    cur.executemany(sql, transactions)
 
 def main():
     # Drop existing database if it exists to start fresh
@@ -98,6 +102,43 @@ def main():
     );
     """
 
+    # Indexes for the lookups in db_utils: accounts by customer, and a customer's
+    # most recent transactions (the composite key also serves the ORDER BY/LIMIT)
+    sql_create_accounts_customer_index = """
+    CREATE INDEX IF NOT EXISTS idx_accounts_customer ON accounts (customer_id);
+    """
+
+    sql_create_transactions_account_index = """
+    CREATE INDEX IF NOT EXISTS idx_transactions_account_timestamp ON transactions (account_id, timestamp DESC);
+    """
+
+    # Full-text index over customer names for db_utils.get_customer_by_name.
+    # External content: it indexes customers.name without storing a second copy.
+    sql_create_customers_fts_table = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(name, content='customers', content_rowid='id');
+    """
+
+    # An external-content table is not updated on its own; these triggers keep it in
+    # sync with later inserts, updates and deletes on customers
+    sql_create_customers_fts_insert_trigger = """
+    CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+        INSERT INTO customers_fts(rowid, name) VALUES (new.id, new.name);
+    END;
+    """
+
+    sql_create_customers_fts_delete_trigger = """
+    CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN
+        INSERT INTO customers_fts(customers_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END;
+    """
+
+    sql_create_customers_fts_update_trigger = """
+    CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE ON customers BEGIN
+        INSERT INTO customers_fts(customers_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO customers_fts(rowid, name) VALUES (new.id, new.name);
+    END;
+    """
+
     if conn is not None:
         # Create tables
         create_table(conn, sql_create_customers_table)
@@ -105,9 +146,13 @@ def main():
         create_table(conn, sql_create_transactions_table)
         print("Tables created successfully.")
 
+        # Load all data in a single transaction: one commit instead of one per row
+        cur = conn.cursor()
+        cur.execute("BEGIN")
+
         # --- Generate Customers ---
-        customer_ids = []
         print(f"Generating {NUM_CUSTOMERS} customers...")
+        customers = []
         for _ in range(NUM_CUSTOMERS):
             join_date = fake.date_between(start_date='-5y', end_date='today').isoformat()
             customer = (
@@ -117,63 +162,87 @@ def main():
                 fake.address().replace('\n', ', '),
                 join_date
             )
-            customer_id = create_customer(conn, customer)
-            customer_ids.append(customer_id)
+            customers.append(customer)
+        customer_ids = create_customers(cur, customers)
         print("Customers generated.")
 
         # --- Generate Accounts ---
-        account_ids = []
         print("Generating accounts...")
+        accounts = []
+        open_dates = [] # Kept as datetimes for generating the account's transactions
         for cust_id in customer_ids:
             num_accounts = random.randint(NUM_ACCOUNTS_PER_CUSTOMER[0], NUM_ACCOUNTS_PER_CUSTOMER[1])
             for _ in range(num_accounts):
                 account_type = random.choice(['Checking', 'Savings'])
                 initial_balance = round(random.uniform(50.0, 10000.0), 2)
-                open_date = fake.date_between(start_date='-4y', end_date='today').isoformat() # Ensure account opened after customer joined
+                open_date = fake.date_between(start_date='-4y', end_date='today') # Ensure account opened after customer joined
                 # Ideally, check against customer join date, but keeping it simple here
-                account = (cust_id, account_type, initial_balance, open_date)
-                account_id = create_account(conn, account)
-                account_ids.append({'id': account_id, 'balance': initial_balance})
+                account = (cust_id, account_type, initial_balance, open_date.isoformat())
+                accounts.append(account)
+                open_dates.append(datetime.combine(open_date, datetime.min.time()))
+        account_ids = [
+            {'id': account_id, 'balance': account[2], 'open_date': open_date}
+            for account_id, account, open_date in zip(create_accounts(cur, accounts), accounts, open_dates)
+        ]
         print("Accounts generated.")
 
         # --- Generate Transactions ---
         print("Generating transactions...")
+        # Faker is slow per call, so generate a pool of descriptions once and sample from it
+        withdrawal_descriptions = [fake.catch_phrase() for _ in range(DESCRIPTION_POOL_SIZE)]
+        deposit_descriptions = [f"Deposit from {fake.company()}" for _ in range(DESCRIPTION_POOL_SIZE)]
+        transactions = []
+        balance_updates = []
+        now = datetime.now()
         for account_info in account_ids:
             acc_id = account_info['id']
             current_balance = account_info['balance']
+            open_date = account_info['open_date']
             num_transactions = random.randint(NUM_TRANSACTIONS_PER_ACCOUNT[0], NUM_TRANSACTIONS_PER_ACCOUNT[1])
 
-            # Get account opening date to generate transactions after that date
-            cur = conn.cursor()
-            cur.execute("SELECT date_opened FROM accounts WHERE id = ?", (acc_id,))
-            open_date_str = cur.fetchone()[0]
-            open_date = datetime.fromisoformat(open_date_str)
+            # Generate transactions between the account's opening date and now
+            # Microsecond resolution, so timestamps keep the .ffffff part of the ISO format
+            span_microseconds = (now - open_date) // timedelta(microseconds=1)
 
             for i in range(num_transactions):
-                # Ensure transaction timestamp is after account opening
-                transaction_ts = fake.date_time_between(start_date=open_date, end_date='now')
+                # Ensure transaction timestamp is after account opening (and not in the future)
+                transaction_ts = open_date + timedelta(microseconds=random.randrange(span_microseconds + 1))
 
                 if current_balance > 10 and random.random() > 0.3: # Higher chance of withdrawal if balance allows
                     transaction_type = 'Withdrawal'
                     # Ensure withdrawal doesn't exceed balance (simplified)
                     amount = round(random.uniform(5.0, min(current_balance * 0.5, 500.0)), 2)
                     current_balance -= amount
-                    description = fake.catch_phrase()
+                    description = random.choice(withdrawal_descriptions)
                 else:
                     transaction_type = 'Deposit'
                     amount = round(random.uniform(10.0, 2000.0), 2)
                     current_balance += amount
-                    description = f"Deposit from {fake.company()}"
+                    description = random.choice(deposit_descriptions)
 
                 transaction = (acc_id, amount, transaction_type, transaction_ts.isoformat(), description)
-                create_transaction(conn, transaction)
+                transactions.append(transaction)
 
-            # Update final account balance after transactions
-            update_sql = "UPDATE accounts SET balance = ? WHERE id = ?"
-            cur.execute(update_sql, (round(current_balance, 2), acc_id))
-            conn.commit()
+            # Final account balance after transactions, written for all accounts at once below
+            balance_updates.append((round(current_balance, 2), acc_id))
+        create_transactions(cur, transactions)
+        cur.executemany("UPDATE accounts SET balance = ? WHERE id = ?", balance_updates)
         print("Transactions generated and account balances updated.")
 
+        cur.execute("COMMIT")
+
+        # Build the indexes only after the bulk load, so the inserts don't maintain them row by row
+        create_table(conn, sql_create_accounts_customer_index)
+        create_table(conn, sql_create_transactions_account_index)
+        create_table(conn, sql_create_customers_fts_table)
+        conn.execute("INSERT INTO customers_fts(customers_fts) VALUES('rebuild')")
+        create_table(conn, sql_create_customers_fts_insert_trigger)
+        create_table(conn, sql_create_customers_fts_delete_trigger)
+        create_table(conn, sql_create_customers_fts_update_trigger)
+        # Gather statistics for the query planner
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA optimize")
+        print("Indexes created and statistics gathered.")
         conn.close()
         print("Database connection closed.")
     else:
@@ -1,120 +1,185 @@
+import atexit
+import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
 
 DATABASE_NAME = 'banking.db'
-
-def create_connection(db_file=DATABASE_NAME):
-    """ Create a database connection to the SQLite database. """
+POOL_SIZE = os.cpu_count() or 4 # Number of read-only connections shared by the query functions
+STATEMENT_CACHE_SIZE = 256 # Prepared statements kept per connection
+
+# Queries, kept as constants so each pooled connection prepares them once and reuses the statement
+SQL_GET_CUSTOMER_BY_NAME = """
+    SELECT c.* FROM customers_fts f
+    JOIN customers c ON c.id = f.rowid
+    WHERE customers_fts MATCH ?
+    LIMIT 1
+    """
+SQL_GET_CUSTOMER_BY_ID = "SELECT * FROM customers WHERE id = ?"
+SQL_GET_ACCOUNTS_FOR_CUSTOMER = "SELECT * FROM accounts WHERE customer_id = ? ORDER BY account_type"
+SQL_GET_ACCOUNT_BY_ID = "SELECT * FROM accounts WHERE id = ?"
+SQL_GET_TRANSACTIONS_FOR_ACCOUNT = """
+    SELECT * FROM transactions
+    WHERE account_id = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+    """
+
+# Per-connection tuning applied on top of WAL journaling (see configure_connection)
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL", # In WAL mode, only sync at checkpoints instead of on every commit
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000", # 64 MB page cache
+    "PRAGMA mmap_size=268435456", # 256 MB of memory-mapped I/O
+)
+
+def configure_connection(conn, db_file, read_only=False):
+    """ Switch the database to WAL journaling and apply the connection PRAGMAs. """
+    # WAL lets readers and a writer work concurrently; it does not apply to in-memory
+    # databases, and read-only connections cannot change the journal mode
+    is_memory = db_file == ':memory:' or 'mode=memory' in db_file
+    if not is_memory and not read_only:
+        conn.execute("PRAGMA journal_mode=WAL")
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
+def create_connection(db_file=None, read_only=False):
+    """ Create a database connection to the SQLite database.
+
+    Defaults to DATABASE_NAME as it is set when called. A `file:` URI (such as a
+    shared in-memory database) is opened as given. Read-only connections are
+    opened through a `mode=ro` URI and may be used from any thread, as the pool
+    hands them to whichever thread asks next.
+    """
+    if db_file is None:
+        db_file = DATABASE_NAME
+    if db_file.startswith('file:'):
+        database, uri = db_file, True
+    elif read_only:
+        database, uri = f"{Path(db_file).resolve().as_uri()}?mode=ro", True
+    else:
+        database, uri = db_file, False
     conn = None
     try:
-        conn = sqlite3.connect(db_file)
-        conn.row_factory = sqlite3.Row # Return rows as dictionary-like objects
+        conn = sqlite3.connect(
+            database,
+            uri=uri,
+            check_same_thread=not read_only,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row # Return rows as dictionary-like objects; the query functions return them as-is
+        configure_connection(conn, db_file, read_only)
     except sqlite3.Error as e:
         print(f"Error connecting to database {db_file}: {e}")
     return conn
 
-def get_customer_by_name(name):
-    """ Query customer by name (case-insensitive partial match). """
-    conn = create_connection()
+# Pool of read-only connections, kept open so their page and statement caches stay warm
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """ Return the pool of read-only connections, opening it on first use.
+
+    Raises sqlite3.OperationalError if the database cannot be opened.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                connections = [create_connection(DATABASE_NAME, read_only=True) for _ in range(POOL_SIZE)]
+                if not all(connections):
+                    for conn in filter(None, connections):
+                        conn.close()
+                    raise sqlite3.OperationalError(f"Could not open database {DATABASE_NAME}")
+                pool = queue.Queue(maxsize=POOL_SIZE)
+                for conn in connections:
+                    pool.put(conn)
+                _pool = pool
+    return _pool
+
+def optimize_database():
+    """ Let SQLite refresh query planner statistics that have gone stale. """
+    # The pooled connections are read-only, so use a short-lived read-write one.
+    # 0x10002 checks every table rather than only those queried on this connection.
+    conn = create_connection(DATABASE_NAME)
     if not conn:
-        return None
-
-    customer = None
+        return
     try:
-        cur = conn.cursor()
-        # Use LIKE for partial matching, adjust if exact match is needed
-        cur.execute("SELECT * FROM customers WHERE lower(name) LIKE lower(?) LIMIT 1", (f'%{name}%',))
-        row = cur.fetchone()
-        if row:
-            customer = dict(row)
+        conn.execute("PRAGMA optimize=0x10002")
     except sqlite3.Error as e:
-        print(f"Error querying customer by name: {e}")
+        print(f"Error optimizing database: {e}")
     finally:
-        if conn:
-            conn.close()
-    return customer
-
-def get_customer_by_id(customer_id):
-    """ Query customer by ID. """
-    conn = create_connection()
-    if not conn:
-        return None
-
-    customer = None
+        conn.close()
+
+def close_pool():
+    """ Close all pooled connections and optimize the database; the pool is reopened on next use. """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is None:
+        return
+    while not pool.empty():
+        pool.get_nowait().close()
+    optimize_database()
+
+atexit.register(close_pool)
+
+@contextmanager
+def pooled_connection(action):
+    """ Lend a pooled connection for the duration of a query.
+
+    SQLite errors raised by the query are printed as "Error <action>: ..." and
+    suppressed, so the query function falls through to its empty result.
+    """
+    pool = get_pool()
+    conn = pool.get()
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM customers WHERE id = ?", (customer_id,))
-        row = cur.fetchone()
-        if row:
-            customer = dict(row)
+        yield conn
     except sqlite3.Error as e:
-        print(f"Error querying customer by id: {e}")
+        print(f"Error {action}: {e}")
     finally:
-        if conn:
-            conn.close()
-    return customer
+        pool.put(conn)
+
+def fts_prefix_query(name):
+    """ Build an FTS5 query matching names that contain every word of `name` as a word prefix. """
+    # Quote each word so the user's input is never parsed as FTS5 query syntax
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in name.split())
+
+def get_customer_by_name(name):
+    """ Query customer by name (case-insensitive match on the start of each name word). """
+    query = fts_prefix_query(name)
+    if not query:
+        return None
+    with pooled_connection("querying customer by name") as conn:
+        # Search the customers_fts full-text index rather than scanning with LIKE '%name%'
+        return conn.execute(SQL_GET_CUSTOMER_BY_NAME, (query,)).fetchone()
+    return None
+
+def get_customer_by_id(customer_id):
+    """ Query customer by ID. """
+    with pooled_connection("querying customer by id") as conn:
+        return conn.execute(SQL_GET_CUSTOMER_BY_ID, (customer_id,)).fetchone()
+    return None
 
 def get_accounts_for_customer(customer_id):
     """ Query all accounts for a given customer ID. """
-    conn = create_connection()
-    if not conn:
-        return []
-
-    accounts = []
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM accounts WHERE customer_id = ? ORDER BY account_type", (customer_id,))
-        rows = cur.fetchall()
-        accounts = [dict(row) for row in rows]
-    except sqlite3.Error as e:
-        print(f"Error querying accounts for customer: {e}")
-    finally:
-        if conn:
-            conn.close()
-    return accounts
+    with pooled_connection("querying accounts for customer") as conn:
+        return conn.execute(SQL_GET_ACCOUNTS_FOR_CUSTOMER, (customer_id,)).fetchall()
+    return []
 
 def get_account_by_id(account_id):
     """ Query account by account ID. """
-    conn = create_connection()
-    if not conn:
-        return None
-
-    account = None
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM accounts WHERE id = ?", (account_id,))
-        row = cur.fetchone()
-        if row:
-            account = dict(row)
-    except sqlite3.Error as e:
-        print(f"Error querying account by id: {e}")
-    finally:
-        if conn:
-            conn.close()
-    return account
+    with pooled_connection("querying account by id") as conn:
+        return conn.execute(SQL_GET_ACCOUNT_BY_ID, (account_id,)).fetchone()
+    return None
 
 def get_transactions_for_account(account_id, limit=20):
     """ Query transactions for a given account ID, ordered by timestamp descending. """
-    conn = create_connection()
-    if not conn:
-        return []
-
-    transactions = []
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT * FROM transactions
-            WHERE account_id = ?
-            ORDER BY timestamp DESC
-            LIMIT ?
-            """, (account_id, limit))
-        rows = cur.fetchall()
-        transactions = [dict(row) for row in rows]
-    except sqlite3.Error as e:
-        print(f"Error querying transactions for account: {e}")
-    finally:
-        if conn:
-            conn.close()
-    return transactions
+    with pooled_connection("querying transactions for account") as conn:
+        return conn.execute(SQL_GET_TRANSACTIONS_FOR_ACCOUNT, (account_id, limit)).fetchall()
+    return []
 
 # --- Example Usage (can be commented out or removed) ---
 if __name__ == '__main__':
@@ -1,6 +1,8 @@
 import unittest
 import sqlite3
 import os
+import re
+import db_utils
 from db_utils import (
     create_connection,
     get_customer_by_id,
@@ -8,7 +10,9 @@ from db_utils import (
     get_accounts_for_customer,
     get_account_by_id,
     get_transactions_for_account,
-    DATABASE_NAME
+    fts_prefix_query,
+    DATABASE_NAME,
+    SQL_GET_CUSTOMER_BY_NAME
 )
 
 # Ensure the database exists before running tests
@@ -16,6 +20,29 @@ if not os.path.exists(DATABASE_NAME):
     print(f"Error: Database file '{DATABASE_NAME}' not found. Run create_dummy_db.py first.")
     exit(1)
 
+# Shared in-memory copy of banking.db; the tests read from it instead of the file
+SNAPSHOT_URI = 'file:banking_test_snapshot?mode=memory&cache=shared'
+snapshot = None
+
+def setUpModule():
+    """ Copy banking.db into the shared in-memory database once and point db_utils at it. """
+    global snapshot
+    source = sqlite3.connect(DATABASE_NAME)
+    snapshot = sqlite3.connect(SNAPSHOT_URI, uri=True) # Keeps the in-memory database alive
+    source.backup(snapshot)
+    source.close()
+    db_utils.DATABASE_NAME = SNAPSHOT_URI
+
+def tearDownModule():
+    """ Close the pool over the snapshot and point db_utils back at the database file. """
+    db_utils.close_pool()
+    db_utils.DATABASE_NAME = DATABASE_NAME
+    snapshot.close()
+
+def name_words(name):
+    """ Split a name into lowercase words the way the FTS5 tokenizer does (letters only, so "O'Connor" is "o", "connor"). """
+    return re.findall(r"[a-z]+", name.lower())
+
 class TestDbUtils(unittest.TestCase):
 
     def test_connection(self):
@@ -31,9 +58,9 @@ class TestDbUtils(unittest.TestCase):
         """ Test retrieving an existing customer by ID (assuming ID 1 exists). """
         print("\nTesting get_customer_by_id (ID: 1)...")
         customer = get_customer_by_id(1)
-        print("Retrieved Customer:", customer) # Print the data
+        print("Retrieved Customer:", dict(customer) if customer else customer) # Print the data
         self.assertIsNotNone(customer, "Customer with ID 1 should be found")
-        self.assertIsInstance(customer, dict, "Customer should be returned as a dictionary")
+        self.assertIsInstance(customer, sqlite3.Row, "Customer should be returned as a sqlite3.Row")
         self.assertEqual(customer['id'], 1, "Customer ID should match the query")
         print("Customer by ID test passed.")
 
@@ -69,9 +96,9 @@ class TestDbUtils(unittest.TestCase):
             self.skipTest("Could not retrieve a sample name from the database to test search.")
 
         customer = get_customer_by_name(name_to_find)
-        print("Retrieved Customer:", customer) # Print the data
+        print("Retrieved Customer:", dict(customer) if customer else customer) # Print the data
         self.assertIsNotNone(customer, f"Customer with name like '{name_to_find}' should be found")
-        self.assertIsInstance(customer, dict, "Customer should be returned as a dictionary")
+        self.assertIsInstance(customer, sqlite3.Row, "Customer should be returned as a sqlite3.Row")
         print("Customer by Name test passed.")
 
     def test_get_customer_by_name_not_exists(self):
@@ -82,16 +109,103 @@ class TestDbUtils(unittest.TestCase):
         self.assertIsNone(customer, "Customer with a non-existent name should return None")
         print("Non-existent customer by name test passed.")
 
+    def customer_names(self):
+        """ Fetch every customer name, to pick search terms from. """
+        conn = create_connection()
+        try:
+            return [row['name'] for row in conn.execute("SELECT name FROM customers")]
+        finally:
+            conn.close()
+
+    def test_get_customer_by_name_lowercase_prefix(self):
+        """ Test that a lowercase prefix of a name word matches. """
+        prefix = name_words(self.customer_names()[0])[-1][:3]
+        print(f"\nTesting get_customer_by_name (prefix: '{prefix}')...")
+        customer = get_customer_by_name(prefix)
+        print("Retrieved Customer:", dict(customer) if customer else customer) # Print the data
+        self.assertIsNotNone(customer, f"A customer with a name word starting with '{prefix}' should be found")
+        self.assertTrue(
+            any(word.startswith(prefix) for word in name_words(customer['name'])),
+            "The matched name should contain a word starting with the prefix",
+        )
+        print("Customer by name prefix test passed.")
+
+    def test_get_customer_by_name_mid_word(self):
+        """ Test that a fragment from the middle of a name word does not match. """
+        words = [word for name in self.customer_names() for word in name_words(name)]
+        # A fragment that occurs inside a word but does not start any word
+        fragment = next(
+            (word[1:4] for word in words
+             if len(word) >= 4 and not any(other.startswith(word[1:4]) for other in words)),
+            None,
+        )
+        if not fragment:
+            self.skipTest("Could not find a mid-word fragment that starts no name word.")
+        print(f"\nTesting get_customer_by_name (mid-word fragment: '{fragment}')...")
+        customer = get_customer_by_name(fragment)
+        print("Retrieved Customer:", dict(customer) if customer else customer) # Print the data (should be None)
+        self.assertIsNone(customer, "Only the start of name words should match")
+        print("Mid-word fragment test passed.")
+
+    def test_get_customer_by_name_fts_syntax(self):
+        """ Test that quotes and FTS5 operators in the name are matched literally, not parsed. """
+        name = 'NoSuchName" OR * -x'
+        print(f"\nTesting get_customer_by_name ({name})...")
+        conn = create_connection()
+        try:
+            # Raises sqlite3.OperationalError if the input leaked into the FTS5 query syntax
+            conn.execute(SQL_GET_CUSTOMER_BY_NAME, (fts_prefix_query(name),)).fetchall()
+        finally:
+            conn.close()
+        customer = get_customer_by_name(name)
+        print("Retrieved Customer:", customer) # Print the data (should be None)
+        self.assertIsNone(customer, "A name with FTS5 syntax characters should not match anyone")
+        print("FTS5 syntax in name test passed.")
+
+    def test_get_customer_by_name_whitespace(self):
+        """ Test that a whitespace-only name returns None. """
+        print("\nTesting get_customer_by_name (whitespace only)...")
+        customer = get_customer_by_name("  \t ")
+        print("Retrieved Customer:", customer) # Print the data (should be None)
+        self.assertIsNone(customer, "A whitespace-only name should return None")
+        print("Whitespace-only name test passed.")
+
+    def test_get_customer_by_name_follows_changes(self):
+        """ Test that the name index follows inserts, renames and deletes on customers. """
+        print("\nTesting get_customer_by_name after customer changes...")
+        conn = create_connection()
+        try:
+            customer_id = conn.execute(
+                "INSERT INTO customers (name, email, phone, address, date_joined) VALUES (?, ?, ?, ?, ?)",
+                ("Zyxwvut Testperson", "zyxwvut@example.com", "555-0100", "1 Test Street", "2024-01-01"),
+            ).lastrowid
+            conn.commit()
+            customer = get_customer_by_name("Zyxwvut")
+            self.assertIsNotNone(customer, "A newly inserted customer should be found by name")
+            self.assertEqual(customer['id'], customer_id, "The new customer should be the one found")
+
+            conn.execute("UPDATE customers SET name = ? WHERE id = ?", ("Qwvutsr Testperson", customer_id))
+            conn.commit()
+            self.assertIsNone(get_customer_by_name("Zyxwvut"), "The old name should no longer match")
+            self.assertIsNotNone(get_customer_by_name("Qwvutsr"), "The new name should match")
+
+            conn.execute("DELETE FROM customers WHERE id = ?", (customer_id,))
+            conn.commit()
+            self.assertIsNone(get_customer_by_name("Qwvutsr"), "A deleted customer should not be found")
+        finally:
+            conn.close()
+        print("Name index sync test passed.")
+
 
     def test_get_accounts_for_customer(self):
         """ Test retrieving accounts for an existing customer (assuming ID 1 exists). """
         print("\nTesting get_accounts_for_customer (CustomerID: 1)...")
         accounts = get_accounts_for_customer(1)
-        print("Retrieved Accounts:", accounts) # Print the data
+        print("Retrieved Accounts:", [dict(acc) for acc in accounts]) # Print the data
         self.assertIsInstance(accounts, list, "Accounts should be returned as a list")
-        # We can't guarantee customer 1 has accounts, but if they do, they should be dicts
+        # We can't guarantee customer 1 has accounts, but if they do, they should be rows
         if accounts:
-            self.assertIsInstance(accounts[0], dict, "Each account in the list should be a dictionary")
+            self.assertIsInstance(accounts[0], sqlite3.Row, "Each account in the list should be a sqlite3.Row")
             self.assertEqual(accounts[0]['customer_id'], 1, "Account's customer_id should match")
         print("Get Accounts test passed.")
 
@@ -99,9 +213,9 @@ class TestDbUtils(unittest.TestCase):
         """ Test retrieving an existing account by ID (assuming ID 1 exists). """
         print("\nTesting get_account_by_id (ID: 1)...")
         account = get_account_by_id(1)
-        print("Retrieved Account:", account) # Print the data
+        print("Retrieved Account:", dict(account) if account else account) # Print the data
         self.assertIsNotNone(account, "Account with ID 1 should be found")
-        self.assertIsInstance(account, dict, "Account should be returned as a dictionary")
+        self.assertIsInstance(account, sqlite3.Row, "Account should be returned as a sqlite3.Row")
         self.assertEqual(account['id'], 1, "Account ID should match the query")
         print("Account by ID test passed.")
 
@@ -117,11 +231,11 @@ class TestDbUtils(unittest.TestCase):
         """ Test retrieving transactions for an existing account (assuming ID 1 exists). """
         print("\nTesting get_transactions_for_account (AccountID: 1)...")
         transactions = get_transactions_for_account(1)
-        print("Retrieved Transactions:", transactions) # Print the data
+        print("Retrieved Transactions:", [dict(tx) for tx in transactions]) # Print the data
         self.assertIsInstance(transactions, list, "Transactions should be returned as a list")
-        # We can't guarantee account 1 has transactions, but if they do, they should be dicts
+        # We can't guarantee account 1 has transactions, but if they do, they should be rows
         if transactions:
-            self.assertIsInstance(transactions[0], dict, "Each transaction should be a dictionary")
+            self.assertIsInstance(transactions[0], sqlite3.Row, "Each transaction should be a sqlite3.Row")
             self.assertEqual(transactions[0]['account_id'], 1, "Transaction's account_id should match")
             # Check if ordered by timestamp descending (difficult to assert exact order without knowing data)
             if len(transactions) > 1: